@@ -1,10 +1,144 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pythoncom
 from win32com import client
 from utils.logger import get_logger
 
 
 log = get_logger("DataTool")
 
+# Word caps useful parallelism; more instances only contend for the same resources.
+MAX_WORD_WORKERS = 4
+
+# COM error raised when Word is busy and rejects an incoming call.
+RPC_E_CALL_REJECTED = -2147418111
+MAX_COM_RETRIES = 5
+
+
+def _configure_word(word):
+    """
+    Disables Word features that add per-document overhead during batch export.
+
+    Args:
+        word: The Word application COM object.
+
+    Returns:
+        dict: The original option values, to be restored with `_restore_word`.
+    """
+    original = {
+        "ScreenUpdating": word.ScreenUpdating,
+        "CheckGrammarAsYouType": word.Options.CheckGrammarAsYouType,
+        "CheckSpellingAsYouType": word.Options.CheckSpellingAsYouType,
+        "Pagination": word.Options.Pagination,
+    }
+    word.Visible = False
+    word.DisplayAlerts = 0
+    word.ScreenUpdating = False
+    word.Options.CheckGrammarAsYouType = False
+    word.Options.CheckSpellingAsYouType = False
+    word.Options.Pagination = False
+    return original
+
+
+def _restore_word(word, original):
+    """
+    Restores the Word options changed by `_configure_word`.
+    """
+    word.ScreenUpdating = original["ScreenUpdating"]
+    word.Options.CheckGrammarAsYouType = original["CheckGrammarAsYouType"]
+    word.Options.CheckSpellingAsYouType = original["CheckSpellingAsYouType"]
+    word.Options.Pagination = original["Pagination"]
+
+
+def _convert_one(word, input_path):
+    """
+    Converts a single .doc/.docx file to .pdf with an already running Word instance.
+
+    The original file is deleted after a successful conversion.
+
+    Args:
+        word: The Word application COM object.
+        input_path (str): Absolute path to the .doc or .docx file.
+
+    Returns:
+        bool: True if the file was converted, False otherwise.
+    """
+    output_path = f"{os.path.splitext(input_path)[0]}.pdf"
+
+    try:
+        for attempt in range(MAX_COM_RETRIES):
+            doc = None
+            try:
+                # Open Word document read-only and export it as PDF (17 is the PDF format in Word)
+                doc = word.Documents.Open(
+                    input_path,
+                    ConfirmConversions=False,
+                    ReadOnly=True,
+                    AddToRecentFiles=False,
+                    Visible=False,
+                )
+                doc.ExportAsFixedFormat(
+                    OutputFileName=output_path,
+                    ExportFormat=17,
+                    OpenAfterExport=False,
+                    OptimizeFor=1,
+                    CreateBookmarks=0,
+                    DocStructureTags=False,
+                )
+                break
+            except pythoncom.com_error as com_error:
+                if com_error.hresult != RPC_E_CALL_REJECTED or attempt == MAX_COM_RETRIES - 1:
+                    raise
+                delay = 2 ** attempt * 0.5
+                log.warning("Word is busy, retrying %s in %.1fs...", input_path, delay)
+                time.sleep(delay)
+            finally:
+                # Close every attempt's document so none stays open in the shared Word instance
+                if doc is not None:
+                    doc.Close(0)
+
+        log.info("Converted: %s -> %s", input_path, output_path)
+
+        # Remove the original file after successful conversion
+        os.remove(input_path)
+        log.info("Deleted original file: %s", input_path)
+        return True
+    except Exception as file_error:
+        log.error("Failed to convert %s: %s", input_path, file_error)
+        return False
+
+
+def _convert_batch(input_paths):
+    """
+    Converts a batch of files inside one worker process.
+
+    The worker owns its own COM apartment and keeps a single Word instance
+    alive for the whole batch.
+
+    Args:
+        input_paths (list[str]): Absolute paths to .doc or .docx files.
+
+    Returns:
+        int: Number of files converted.
+    """
+    pythoncom.CoInitialize()
+    word = None
+    original = None
+    try:
+        word = client.DispatchEx("Word.Application")
+        original = _configure_word(word)
+        return sum(_convert_one(word, path) for path in input_paths)
+    except Exception as e:
+        log.error("Word worker failed: %s", e)
+        return 0
+    finally:
+        if word is not None:
+            if original is not None:
+                _restore_word(word, original)
+            word.Quit()
+        pythoncom.CoUninitialize()
+
 
 class DataTool:
     def __init__(self):
@@ -18,51 +152,44 @@ class DataTool:
         """
         Converts .doc, .DOC, and .docx files to .pdf in the given folder.
 
+        Conversions run in parallel, each worker process keeping one Word
+        instance alive for its share of the files.
+
         Args:
             folder (str): Path to the folder containing .doc and .docx files.
         """
-        log.info(f"Scanning folder: {folder} for .doc, .DOC, and .docx files...")
+        log.info("Scanning folder: %s for .doc, .DOC, and .docx files...", folder)
         # Create output folder if it doesn't exist
         if not os.path.exists(folder):
             os.makedirs(folder)
 
-        # Initialize Word application
-        word = client.Dispatch("Word.Application")
-        word.Visible = False
-
+        files = []
         try:
-            for filename in os.listdir(folder):
-                # Process .doc, .DOC, and .docx files
-                if filename.lower().endswith((".doc", ".docx")):
-                    input_path = os.path.abspath(os.path.join(folder, filename))
-                    output_path = os.path.abspath(os.path.join(folder, f"{os.path.splitext(filename)[0]}.pdf"))
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # Process .doc, .DOC, and .docx files
+                    if not entry.is_file() or not entry.name.lower().endswith((".doc", ".docx")):
+                        continue
 
-                    if os.path.getsize(input_path) == 0:
+                    input_path = os.path.abspath(entry.path)
+                    if entry.stat().st_size == 0:
                         # Delete empty file
                         os.remove(input_path)
-                        log.warning(f"Deleted empty file: {input_path}")
+                        log.warning("Deleted empty file: %s", input_path)
                         continue
 
-                    if not os.path.exists(input_path):
-                        log.warning(f"File not found: {input_path}")
-                        continue
+                    files.append(input_path)
 
-                    try:
-                        # Open Word document
-                        doc = word.Documents.Open(input_path)
+            if not files:
+                log.info("No .doc or .docx files to convert.")
+                return
 
-                        # Save as PDF
-                        doc.SaveAs(output_path, FileFormat=17)  # 17 is the PDF format in Word
-                        doc.Close()
+            # Split the files round-robin so each worker reuses one Word instance
+            workers = min(MAX_WORD_WORKERS, len(files))
+            batches = [files[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                converted = sum(executor.map(_convert_batch, batches))
 
-                        log.info(f"Converted: {input_path} -> {output_path}")
-
-                        # Remove the original file after successful conversion
-                        os.remove(input_path)
-                        log.info(f"Deleted original file: {input_path}")
-                    except Exception as file_error:
-                        log.error(f"Failed to convert {input_path}: {file_error}")
+            log.info("Converted %s/%s file(s) to PDF.", converted, len(files))
         except Exception as e:
-            log.error(f"General error during conversion: {e}")
-        finally:
-            word.Quit()
+            log.error("General error during conversion: %s", e)
@@ -1,16 +1,29 @@
 import os
 import sys
-import json
+import errno
+import queue
+import orjson
 import psycopg2
-import fitz  # PyMuPDF
 import uuid
 import shutil
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
 from pdf2image import convert_from_path
-import easyocr
-import numpy as np
-from PIL import Image
+from psycopg2.extras import execute_values
+
+# Ensure the project root is in the Python path.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from utils.logger import get_logger
+from utils.retry import retry
+from utils.db import get_connection, pooled_connection
+from utils.disk_cache import prune_cache
+from augmenter.pdf_text import extract_text, PDF_TEXT_CACHE_DIR
 
 # Load environment variables
 load_dotenv()
@@ -25,37 +38,56 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 if not all([POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB]):
     raise ValueError("❌ Missing PostgreSQL environment variables. Check your .env file.")
 
+# Every PDF starts with this header within its first kilobyte
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+# Worker processes for text extraction (CPU-bound) and threads for storage (I/O-bound).
+# Each extraction worker may load its own EasyOCR model, so the pool stays small.
+EXTRACT_WORKERS = min(4, os.cpu_count() or 4)
+STORAGE_WORKERS = 4
+
+# Number of CV PDFs buffered before they are written to PostgreSQL in one batch
+ATTACHMENT_BATCH_SIZE = 16
+
+# Folder where CVs that could not be processed are moved
+REJECTED_FOLDER = "src/data/cv_rejected"
+
 # Configure Logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-log = logging.getLogger("CVProcessor")
+log = get_logger("CVProcessor", level=logging.INFO)
 
 class CVProcessor:
     def __init__(self):
         """
         Initializes the CVProcessor and ensures PostgreSQL connectivity.
+        The `cv_attachment` table must already exist, see `migrate`.
         """
         log.info("🚀 Initializing CVProcessor...")
+        self.pending_attachments = []
+        # Attachments are only batched during `process_cvs_in_folder`, which flushes them
+        self.batch_attachments = False
+        self.attachments_lock = threading.Lock()
+        self.rejections = queue.Queue()
+        self.rejection_worker = None
 
         try:
-            self.pg_conn = psycopg2.connect(
-                dbname=POSTGRES_DB,
-                user=POSTGRES_USER,
-                password=POSTGRES_PASSWORD,
-                host=POSTGRES_HOST,
-                port=POSTGRES_PORT
-            )
-            self.ensure_attachments_table_exists()
+            # Open the shared pool up front so connection problems surface here
+            with pooled_connection():
+                pass
             log.info("✅ Successfully connected to PostgreSQL.")
         except Exception as e:
-            log.critical(f"❌ PostgreSQL connection failed: {e}")
+            log.critical("❌ PostgreSQL connection failed: %s", e)
             raise RuntimeError("Database connection failed.")
 
-    def ensure_attachments_table_exists(self):
+    @classmethod
+    def migrate(cls):
         """
-        Ensures the 'attachments' table exists in PostgreSQL.
+        Creates the 'cv_attachment' table in PostgreSQL if it does not exist.
+        Run once before the first ingestion: `python src/augmenter/cv_processor.py migrate`.
         """
         try:
-            cursor = self.pg_conn.cursor()
+            conn = get_connection()
+            cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS cv_attachment (
                     id UUID PRIMARY KEY,
@@ -64,96 +96,207 @@ class CVProcessor:
                     created_at TIMESTAMP DEFAULT NOW()
                 );
             """)
-            self.pg_conn.commit()
+            conn.commit()
             cursor.close()
+            conn.close()
             log.info("✅ PostgreSQL table 'cv_attachment' ensured to exist.")
         except Exception as e:
-            log.error(f"❌ Error ensuring PostgreSQL table exists: {e}")
+            log.error("❌ Error ensuring PostgreSQL table exists: %s", e)
             raise
 
     def process_cvs_in_folder(self, pdf_folder):
         """
         Processes all PDF files in a given folder.
+        Text extraction runs in a process pool and storage in a thread pool of
+        the main process, so a CV can be stored while the next ones are still
+        being extracted. Database access and rejections stay in this process.
         """
-        pdf_files = [f for f in os.listdir(pdf_folder) if f.endswith(".pdf")]
+        # The text cache holds personal data; keep it bounded in size and age
+        prune_cache(PDF_TEXT_CACHE_DIR)
 
-        for filename in pdf_files:
-            try:
-                log.info(f"📄 Processing file: {filename}")
-                pdf_path = os.path.join(pdf_folder, filename)
-                extracted_text = self.extract_text_from_pdf(pdf_path)
+        with os.scandir(pdf_folder) as entries:
+            pdf_entries = [e for e in entries if e.name.endswith(".pdf") and e.is_file()]
 
-                if not extracted_text.strip():
-                    raise ValueError("No text extracted from PDF")
+        # Rejected files are moved by a background thread so workers never wait on the filesystem
+        self.rejection_worker = threading.Thread(target=self.drain_rejections, daemon=True)
+        self.rejection_worker.start()
+        self.batch_attachments = True
+        try:
+            self.run_pipeline(pdf_entries)
+        finally:
+            # Write the last partial batch even if the run failed; its rejections still go to the worker
+            self.batch_attachments = False
+            self.flush_attachments()
+            self.rejections.put(None)
+            self.rejection_worker.join()
+            self.rejection_worker = None
+
+    def run_pipeline(self, pdf_entries):
+        """
+        Extracts and stores the given PDF directory entries.
+        """
+        with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as extract_pool, \
+                ThreadPoolExecutor(max_workers=STORAGE_WORKERS) as storage_pool:
+            extract_futures = {}
+            for entry in pdf_entries:
+                # Empty files can never yield text, reject them without opening
+                if entry.stat().st_size == 0:
+                    self.process_and_move_rejected(entry.path, "Empty PDF file")
+                    continue
+
+                log.info("📄 Processing file: %s", entry.name)
+                future = extract_pool.submit(CVProcessor.load_cv, entry.path)
+                extract_futures[future] = (entry.name, entry.path)
+
+            storage_futures = [
+                storage_pool.submit(self.store_extracted_cv, future, *extract_futures[future])
+                for future in as_completed(extract_futures)
+            ]
+            wait(storage_futures)
+
+    def store_extracted_cv(self, extract_future, filename, pdf_path):
+        """
+        Structures and saves a CV once its text extraction has completed.
+        """
+        try:
+            pdf_bytes, extracted_text = extract_future.result()
 
-                structured_cv = self.create_structured_cv(extracted_text, filename, pdf_path)
+            if not extracted_text.strip():
+                raise ValueError("No text extracted from PDF")
 
-                if "error" in structured_cv:
-                    raise ValueError(f"Error creating structured CV for file '{filename}'")
+            structured_cv = self.create_structured_cv(extracted_text, filename, pdf_path, pdf_bytes)
 
-                log.info(f"✅ Successfully processed and saved CV from file: {filename}")
-            except Exception as e:
-                log.warning(f"⚠️ Error with file '{filename}': {e}. Moving to rejected folder.")
-                self.process_and_move_rejected(pdf_path, str(e))
+            if "error" in structured_cv:
+                raise ValueError(f"Error creating structured CV for file '{filename}'")
+
+            log.info("✅ Successfully processed CV from file: %s", filename)
+        except BrokenProcessPool as e:
+            # A crashed worker (e.g. OCR out of memory) fails every pending file, not just its own;
+            # leave them in place so the next run retries them
+            log.error("❌ Extraction worker crashed before '%s' was processed: %s. Leaving it in place.", filename, e)
+        except Exception as e:
+            log.warning("⚠️ Error with file '%s': %s. Moving to rejected folder.", filename, e)
+            self.process_and_move_rejected(pdf_path, str(e))
+
+    @staticmethod
+    def load_cv(pdf_path):
+        """
+        Reads a CV PDF from disk once and extracts its text from the in-memory bytes.
+        Returns the bytes as well so they can be stored without re-reading the file.
+        Files without a PDF header are rejected before PyMuPDF parses them.
+        """
+        pdf_bytes = CVProcessor.read_pdf_bytes(pdf_path)
+        if pdf_bytes.find(PDF_MAGIC, 0, PDF_MAGIC_WINDOW) == -1:
+            raise ValueError("File is not a valid PDF")
+        return pdf_bytes, CVProcessor.extract_text_from_pdf(pdf_path, pdf_bytes)
 
-    def extract_text_from_pdf(self, pdf_path):
+    @staticmethod
+    def extract_text_from_pdf(pdf_path, pdf_bytes=None):
         """
         Extracts text from a PDF file, combining text from all pages.
-        Uses both text extraction and OCR if needed.
+        Uses both text extraction and OCR if needed, see `augmenter.pdf_text`.
+        When `pdf_bytes` is given, the PDF is parsed from memory instead of `pdf_path`.
         """
         try:
-            log.info(f"🔍 Extracting text from PDF: {pdf_path}")
-            reader = easyocr.Reader(["en"])  
-            doc = fitz.open(pdf_path)
-            text = ""
-
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()
-
-                if page_text.strip():
-                    text += page_text
-                else:
-                    log.warning(f"⚠️ No text found on page {page_num + 1}. Attempting OCR.")
-                    pix = page.get_pixmap()
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    ocr_text = reader.readtext(np.array(img), detail=0)
-                    text += " ".join(ocr_text)
-
-            doc.close()
+            log.info("🔍 Extracting text from PDF: %s", pdf_path)
+            if pdf_bytes is None:
+                pdf_bytes = CVProcessor.read_pdf_bytes(pdf_path)
+            text = extract_text(pdf_bytes)
 
             if not text.strip():
                 raise ValueError("No text extracted from PDF")
 
-            log.info(f"✅ Successfully extracted text from PDF: {pdf_path}")
+            log.info("✅ Successfully extracted text from PDF: %s", pdf_path)
             return text.strip()
 
         except Exception as e:
-            log.error(f"❌ Error extracting text from PDF {pdf_path}: {e}")
+            log.error("❌ Error extracting text from PDF %s: %s", pdf_path, e)
             raise RuntimeError(f"Error extracting text from PDF: {e}")
 
-    def save_pdf_to_postgres(self, cv_id, pdf_path):
+    @staticmethod
+    def read_pdf_bytes(pdf_path):
         """
-        Saves the CV PDF as binary data into PostgreSQL.
+        Reads a whole PDF file with a single unbuffered read.
         """
-        try:
-            cursor = self.pg_conn.cursor()
-            with open(pdf_path, 'rb') as file:
-                binary_data = file.read()
-
-            cursor.execute(
-                "INSERT INTO cv_attachment (id, filename, pdf) VALUES (%s, %s, %s) "
-                "ON CONFLICT (id) DO NOTHING;",
-                (cv_id, os.path.basename(pdf_path), psycopg2.Binary(binary_data))
-            )
-            self.pg_conn.commit()
-            cursor.close()
-            log.info(f"✅ CV PDF saved in PostgreSQL for ID: {cv_id}")
+        with open(pdf_path, "rb", buffering=0) as file:
+            return file.read()
 
+    def save_pdf_to_postgres(self, cv_id, pdf_path, pdf_bytes=None):
+        """
+        Saves the CV PDF in PostgreSQL. During a folder run the PDF is queued
+        instead, and the batch is written once `ATTACHMENT_BATCH_SIZE` PDFs are pending.
+        Returns True if the PDF was written, False if it was only queued.
+        """
+        try:
+            if pdf_bytes is None:
+                pdf_bytes = CVProcessor.read_pdf_bytes(pdf_path)
         except Exception as e:
-            log.error(f"❌ Failed to save attachment to PostgreSQL: {e}")
+            log.error("❌ Failed to read attachment '%s': %s", pdf_path, e)
             raise RuntimeError("Error saving CV PDF to PostgreSQL.")
 
+        if not self.batch_attachments:
+            try:
+                self.insert_attachments([(cv_id, pdf_path, pdf_bytes)])
+            except Exception as e:
+                log.error("❌ Failed to save attachment '%s' to PostgreSQL: %s", pdf_path, e)
+                raise RuntimeError("Error saving CV PDF to PostgreSQL.")
+            log.info("✅ CV PDF saved in PostgreSQL: %s", pdf_path)
+            return True
+
+        with self.attachments_lock:
+            self.pending_attachments.append((cv_id, pdf_path, pdf_bytes))
+            batch_full = len(self.pending_attachments) >= ATTACHMENT_BATCH_SIZE
+
+        if batch_full:
+            self.flush_attachments()
+        return False
+
+    def flush_attachments(self):
+        """
+        Writes all pending CV PDFs to PostgreSQL in a single transaction.
+        On failure, every PDF of the batch is moved to the rejected folder.
+        """
+        with self.attachments_lock:
+            batch, self.pending_attachments = self.pending_attachments, []
+
+        if not batch:
+            return
+
+        try:
+            self.insert_attachments(batch)
+            log.info("✅ %s CV PDF(s) saved in PostgreSQL.", len(batch))
+
+        except Exception as e:
+            log.error("❌ Failed to save attachments to PostgreSQL: %s", e)
+            for _, pdf_path, _ in batch:
+                self.process_and_move_rejected(pdf_path, str(e))
+
+    @retry(retry_on=(psycopg2.OperationalError,))
+    def insert_attachments(self, batch):
+        """
+        Inserts a batch of `(cv_id, pdf_path, pdf_bytes)` rows in one transaction.
+        Transient connection errors are retried on a fresh pooled connection.
+        """
+        with pooled_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                # One multi-row INSERT statement for the whole batch
+                execute_values(
+                    cursor,
+                    "INSERT INTO cv_attachment (id, filename, pdf) VALUES %s "
+                    "ON CONFLICT (id) DO NOTHING;",
+                    [(cv_id, os.path.basename(pdf_path), psycopg2.Binary(pdf_bytes))
+                     for cv_id, pdf_path, pdf_bytes in batch],
+                    template="(%s, %s, %s)",
+                    page_size=ATTACHMENT_BATCH_SIZE
+                )
+                conn.commit()
+                cursor.close()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+
     def save_json_locally(self, cv_id, content):
         """
         Saves the structured CV as a JSON file locally in `src/data/cv_json/`.
@@ -163,20 +306,21 @@ class CVProcessor:
             os.makedirs(json_dir, exist_ok=True)
             json_path = os.path.join(json_dir, f"{cv_id}.json")
 
-            with open(json_path, "w", encoding="utf-8") as json_file:
-                json.dump(content, json_file, ensure_ascii=False, indent=4)
+            # orjson emits compact UTF-8 bytes in a single write
+            with open(json_path, "wb") as json_file:
+                json_file.write(orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS))
 
-            log.info(f"✅ Structured CV saved locally at {json_path}")
+            log.info("✅ Structured CV saved locally at %s", json_path)
 
         except Exception as e:
-            log.error(f"❌ Error saving JSON locally: {e}")
+            log.error("❌ Error saving JSON locally: %s", e)
 
-    def create_structured_cv(self, extracted_text, filename, cv_path):
+    def create_structured_cv(self, extracted_text, filename, cv_path, pdf_bytes=None):
         """
         Generates a structured CV and saves it to PostgreSQL and local storage.
         """
         if not extracted_text.strip():
-            log.warning(f"⚠️ Extracted text is empty for file '{filename}'. Skipping processing.")
+            log.warning("⚠️ Extracted text is empty for file '%s'. Skipping processing.", filename)
             self.process_and_move_rejected(cv_path, "Empty CV text")
             return {"error": "Empty CV text"}
 
@@ -193,31 +337,61 @@ class CVProcessor:
             # Save JSON locally
             self.save_json_locally(cv_id, structured_cv)
 
-            # Save PDF to PostgreSQL
-            self.save_pdf_to_postgres(cv_id, cv_path)
-
-            log.info(f"✅ Successfully processed and saved CV: {filename}")
+            # Save (or, during a folder run, queue) the PDF for PostgreSQL
+            if self.save_pdf_to_postgres(cv_id, cv_path, pdf_bytes):
+                log.info("✅ Successfully processed and saved CV: %s", filename)
+            else:
+                log.info("📥 Processed CV, PDF queued for PostgreSQL: %s", filename)
             return structured_cv
 
         except Exception as e:
-            log.error(f"❌ Error creating structured CV for file '{filename}': {e}")
+            log.error("❌ Error creating structured CV for file '%s': %s", filename, e)
             self.process_and_move_rejected(cv_path, str(e))
             return {"error": f"Structured CV creation failed: {str(e)}"}
 
     def process_and_move_rejected(self, file_path, error_msg):
         """
         Move rejected CVs to `cv_rejected/` folder.
+        During a folder run the move is queued to the background rejection worker.
         """
-        rejected_folder = "src/data/cv_rejected"
-        os.makedirs(rejected_folder, exist_ok=True)
+        if self.rejection_worker is not None:
+            self.rejections.put((file_path, error_msg))
+        else:
+            self.move_rejected(file_path, error_msg)
+
+    def drain_rejections(self):
+        """
+        Moves queued rejected CVs until a `None` sentinel is received.
+        """
+        while True:
+            item = self.rejections.get()
+            if item is None:
+                return
+            self.move_rejected(*item)
+
+    def move_rejected(self, file_path, error_msg):
+        """
+        Moves a rejected CV with an atomic rename, copying only across filesystems.
+        """
+        os.makedirs(REJECTED_FOLDER, exist_ok=True)
+        target_path = os.path.join(REJECTED_FOLDER, os.path.basename(file_path))
 
         try:
-            shutil.move(file_path, os.path.join(rejected_folder, os.path.basename(file_path)))
-            log.warning(f"⚠️ Moved rejected file '{file_path}' to {rejected_folder} due to error: {error_msg}")
+            try:
+                os.replace(file_path, target_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(file_path, target_path)
+            log.warning("⚠️ Moved rejected file '%s' to %s due to error: %s", file_path, REJECTED_FOLDER, error_msg)
         except Exception as e:
-            log.error(f"❌ Failed to move rejected file '{file_path}': {e}")
+            log.error("❌ Failed to move rejected file '%s': %s", file_path, e)
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        CVProcessor.migrate()
+        sys.exit(0)
+
     log.info("🚀 Starting CV processing pipeline.")
     processor = CVProcessor()
     processor.process_cvs_in_folder("src/data/cv")
@@ -0,0 +1,98 @@
+import os
+import hashlib
+import logging
+import fitz  # PyMuPDF
+import easyocr
+import numpy as np
+
+from utils.logger import get_logger
+
+log = get_logger("PDFText", level=logging.INFO)
+
+# Extracted text is cached on disk by PDF content hash, so unchanged CVs are parsed only once
+PDF_TEXT_CACHE_DIR = os.path.join("src", "data", "pdf_text_cache")
+
+# Plain-text extraction; dehyphenate words split across lines
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT | fitz.TEXT_DEHYPHENATE
+
+# Page render scale for OCR
+OCR_ZOOM = fitz.Matrix(1.5, 1.5)
+
+# EasyOCR reader, loaded on first use since building it loads the model weights
+_OCR_READER = None
+
+# Torch threads per OCR reader; extraction already runs one reader per worker process
+OCR_TORCH_THREADS = 1
+
+
+def get_ocr_reader():
+    """
+    Returns the process-wide EasyOCR reader, creating it on first use.
+    """
+    global _OCR_READER
+    if _OCR_READER is None:
+        log.info("🧠 Loading EasyOCR reader...")
+        # easyocr already depends on torch, so this import adds nothing new
+        import torch
+        torch.set_num_threads(OCR_TORCH_THREADS)
+        _OCR_READER = easyocr.Reader(["en"])
+    return _OCR_READER
+
+
+def _cache_path(pdf_bytes):
+    digest = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+    return os.path.join(PDF_TEXT_CACHE_DIR, f"{digest}.txt")
+
+
+def _extract_text_uncached(pdf_bytes):
+    """
+    Extracts text from all pages of an in-memory PDF, OCR-ing pages without a text layer.
+    """
+    parts = []
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page_num, page in enumerate(doc):
+            page_text = page.get_text("text", flags=TEXT_FLAGS, sort=True)
+
+            if page_text.strip():
+                parts.append(page_text)
+            else:
+                log.warning("⚠️ No text found on page %s. Attempting OCR.", page_num + 1)
+                # Grayscale render at 1.5x zoom, read as a zero-copy view over the pixmap
+                pix = page.get_pixmap(matrix=OCR_ZOOM, colorspace=fitz.csGRAY)
+                img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width)
+                ocr_text = get_ocr_reader().readtext(img, detail=0, paragraph=True, batch_size=8)
+                parts.append(" ".join(ocr_text))
+
+    return "\n".join(parts)
+
+
+def extract_text(pdf_bytes):
+    """
+    Extracts the text of a PDF, reusing the cached result for identical files.
+
+    Args:
+        pdf_bytes (bytes): The raw PDF content.
+
+    Returns:
+        str: The text of all pages, joined with newlines.
+    """
+    cache_path = _cache_path(pdf_bytes)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            log.info("♻️ Reusing cached text: %s", cache_path)
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    text = _extract_text_uncached(pdf_bytes)
+
+    if text.strip():
+        os.makedirs(PDF_TEXT_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file first so concurrent workers never read a partial entry
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+
+    return text
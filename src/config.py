@@ -5,8 +5,27 @@ load_dotenv()
 
 # Path to Chroma database and job description file
 CHROMA_DB_PATH = os.path.join("src", "data", "chromadb")
+EMBEDDINGS_CACHE_PATH = os.path.join("src", "data", "embeddings_cache")
+RANKING_CACHE_PATH = os.path.join("src", "data", "ranking_cache")
+QUERY_VARIANTS_CACHE_PATH = os.path.join("src", "data", "query_variants_cache")
 JOB_DESCRIPTION_PATH = os.path.join("src", "data", "job description", "Job_Description_Italian.txt") # used to test 
 
 # OpenAI settings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY_MAIN")
 EMBEDDINGS_MODEL = os.getenv("OPENAI_EMBEDDINGS_MODEL_DEPLOYMENT", "text-embedding-ada-002")
+# Optional shorter vectors for text-embedding-3 models; changing it requires re-embedding the CVs
+EMBEDDINGS_DIMENSIONS = int(os.getenv("OPENAI_EMBEDDINGS_DIMENSIONS", "0")) or None
+
+# Set to 0 to rank CVs on embedding similarity alone, without the LLM rerank call
+LLM_RERANK = os.getenv("LLM_RERANK", "1") != "0"
+
+# Cosine similarity thresholds, tuned for text-embedding-ada-002. The text-embedding-3
+# models give much lower similarities, so lower these after switching models.
+RERANK_CUTOFF = float(os.getenv("RERANK_CUTOFF", "0.55"))
+AUTO_ACCEPT_SIMILARITY = float(os.getenv("AUTO_ACCEPT_SIMILARITY", "0.9"))
+COMPRESSION_SIMILARITY = float(os.getenv("COMPRESSION_SIMILARITY", "0.76"))
+# Minimum similarity of a CV in the web app when LLM_RERANK is off
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.65"))
+
+# Web app
+FLASK_DEBUG = os.getenv("FLASK_DEBUG") == "1"
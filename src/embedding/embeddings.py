@@ -1,12 +1,15 @@
 import os
 import sys
-import json
+import hashlib
+import orjson
+import numpy as np
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import chromadb
 from dotenv import load_dotenv
 from langchain_community.document_loaders import JSONLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
 
 # ========================== #
@@ -39,6 +42,7 @@ logger = logging.getLogger(__name__)
 
 CV_JSON_FOLDER = "src/data/cv_json"   # Path where CV JSON files are stored
 CHROMA_DB_PATH = "src/data/chromadb"  # Path where ChromaDB stores embeddings
+CHROMA_COLLECTION_NAME = "langchain"  # Default collection used by the LangChain Chroma wrapper
 
 # Ensure directories exist
 os.makedirs(CV_JSON_FOLDER, exist_ok=True)
@@ -50,61 +54,94 @@ os.makedirs(CHROMA_DB_PATH, exist_ok=True)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDINGS_MODEL = os.getenv("OPENAI_EMBEDDINGS_MODEL_DEPLOYMENT", "text-embedding-ada-002")
+# Optional shorter vectors for text-embedding-3 models; must match the retriever's setting
+EMBEDDINGS_DIMENSIONS = int(os.getenv("OPENAI_EMBEDDINGS_DIMENSIONS", "0")) or None
+EMBED_BATCH_SIZE = 256  # Chunks sent per embeddings request; 256 x 800 tokens stays under the 300k-token request limit
+EMBED_WORKERS = 8       # Concurrent embeddings requests
+LOAD_WORKERS = 16       # Concurrent JSON file reads
+
+# ========================== #
+#  ✅ TEXT SPLITTER          #
+# ========================== #
+
+# Built once; chunk sizes are counted in embedding-model tokens, not characters
+TEXT_SPLITTER = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+    encoding_name="cl100k_base",  # Tokenizer used by OpenAI embedding models
+    chunk_size=800,  # Max tokens per chunk
+    chunk_overlap=80,  # Overlap between chunks to maintain context
+    separators=["\n\n", "\n", " "]
+)
 
 # ========================== #
 #  ✅ FUNCTION DEFINITIONS   #
 # ========================== #
 
+def format_json_field(key, value):
+    """
+    Formats a single JSON field as a titled text block, recursing into nested objects.
+    """
+    if isinstance(value, str):
+        return f"{key.title()}:\n{value}"
+    if isinstance(value, list):
+        return f"{key.title()}:\n" + "\n".join(f"- {v}" for v in value if isinstance(v, str))
+    if isinstance(value, dict):
+        nested = extract_text_from_json(value)
+        return f"{key.title()}:\n{nested}" if nested else ""
+    return ""
+
+
 def extract_text_from_json(json_data):
     """
     Extracts key fields from JSON and converts them into a single text string.
     """
-    extracted_text = ""
+    if not isinstance(json_data, dict):
+        return ""
 
-    if isinstance(json_data, dict):
-        for key, value in json_data.items():
-            if isinstance(value, str):
-                extracted_text += f"{key.title()}:\n{value}\n\n"
-            elif isinstance(value, list):
-                extracted_text += f"{key.title()}:\n" + "\n".join([f"- {v}" for v in value if isinstance(v, str)]) + "\n\n"
+    parts = (format_json_field(key, value) for key, value in json_data.items())
+    return "\n\n".join(part for part in parts if part).strip()
 
-    return extracted_text.strip()
+
+def load_json_document(json_file):
+    """
+    Reads one CV JSON file and converts it into a LangChain Document.
+    Returns None if the file cannot be parsed or has no usable text.
+    """
+    try:
+        with open(json_file, "rb") as f:
+            json_data = orjson.loads(f.read())
+
+        text_content = extract_text_from_json(json_data)
+
+        if not text_content:
+            logger.warning(f"⚠️ No valid text extracted from {json_file}. Skipping.")
+            return None
+
+        logger.info(f"✅ Loaded and processed {json_file}")
+
+        # Create a LangChain Document object
+        return Document(page_content=text_content, metadata={"source": json_file})
+
+    except Exception as e:
+        logger.error(f"❌ Failed to process {json_file}: {e}")
+        return None
 
 
 def load_json_documents():
     """
-    Reads JSON files from `src/data/cv_json/`, extracts relevant fields,
+    Reads JSON files from `src/data/cv_json/` in parallel, extracts relevant fields,
     and formats them into plain text.
     """
     logger.info(f"📂 Scanning JSON files in: {CV_JSON_FOLDER}")
 
-    json_files = [os.path.join(CV_JSON_FOLDER, f) for f in os.listdir(CV_JSON_FOLDER) if f.endswith(".json")]
+    with os.scandir(CV_JSON_FOLDER) as entries:
+        json_files = [e.path for e in entries if e.is_file() and e.name.endswith(".json")]
 
     if not json_files:
         logger.error("❌ No JSON files found. Exiting.")
         return []
 
-    all_documents = []
-
-    for json_file in json_files:
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
-
-            text_content = extract_text_from_json(json_data)
-
-            if not text_content:
-                logger.warning(f"⚠️ No valid text extracted from {json_file}. Skipping.")
-                continue
-
-            # Create a LangChain Document object
-            document = Document(page_content=text_content, metadata={"source": json_file})
-            all_documents.append(document)
-
-            logger.info(f"✅ Loaded and processed {json_file}")
-
-        except Exception as e:
-            logger.error(f"❌ Failed to process {json_file}: {e}")
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        all_documents = [doc for doc in executor.map(load_json_document, json_files) if doc is not None]
 
     logger.info(f"📜 Total documents loaded: {len(all_documents)}")
     return all_documents
@@ -116,14 +153,8 @@ def split_documents(documents):
     """
     logger.info("🔹 Splitting documents into smaller chunks...")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,  # Max tokens per chunk
-        chunk_overlap=100,  # Overlap between chunks to maintain context
-        separators=["\n\n", "\n", " "]
-    )
-
     try:
-        split_docs = text_splitter.split_documents(documents)
+        split_docs = TEXT_SPLITTER.split_documents(documents)
         logger.info(f"✅ Split into {len(split_docs)} chunks.")
         return split_docs
     except Exception as e:
@@ -131,31 +162,85 @@ def split_documents(documents):
         return []
 
 
-def embed_and_store_documents(split_docs):
+def chunk_id(doc):
+    """
+    Returns a stable ID for a chunk, derived from its source file and content.
     """
-    Generates embeddings and stores them in ChromaDB.
+    key = f"{doc.metadata.get('source', '')}\0{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def embed_and_store_documents(split_docs, reembed=False):
+    """
+    Generates embeddings in concurrent batches and stores them in ChromaDB.
+    Chunks already stored by a previous run are skipped, so only new content is embedded,
+    and stored chunks that are no longer in `split_docs` are deleted.
+    With `reembed`, every chunk is embedded again and overwrites its stored vector
+    (needed once for stores built before vectors were normalized to unit length).
     """
     logger.info("🧠 Generating embeddings and storing in ChromaDB...")
 
     try:
         embeddings = OpenAIEmbeddings(
             model=EMBEDDINGS_MODEL,
-            openai_api_key=OPENAI_API_KEY
-        )
-
-        # Store in ChromaDB
-        vector_store = Chroma.from_documents(
-            documents=split_docs,
-            embedding=embeddings,
-            persist_directory=CHROMA_DB_PATH
+            dimensions=EMBEDDINGS_DIMENSIONS,
+            openai_api_key=OPENAI_API_KEY,
+            chunk_size=EMBED_BATCH_SIZE,
+            max_retries=5
         )
 
-        logger.info(f"✅ Successfully stored {len(split_docs)} vector embeddings in ChromaDB.")
+        collection = chromadb.PersistentClient(path=CHROMA_DB_PATH).get_or_create_collection(CHROMA_COLLECTION_NAME)
+
+        # Keep only chunks whose content-hash ID is not stored yet
+        docs_by_id = {chunk_id(doc): doc for doc in split_docs}
+        ids = list(docs_by_id)
+
+        # Drop chunks of removed or changed CVs, and copies stored under older random ids
+        stale = [i for i in collection.get(include=[])["ids"] if i not in docs_by_id]
+        for start in range(0, len(stale), EMBED_BATCH_SIZE):
+            collection.delete(ids=stale[start:start + EMBED_BATCH_SIZE])
+        if stale:
+            logger.info(f"🗑️ Deleted {len(stale)} stale chunk(s) from ChromaDB.")
+
+        existing = set()
+        if not reembed:
+            for start in range(0, len(ids), EMBED_BATCH_SIZE):
+                existing.update(collection.get(ids=ids[start:start + EMBED_BATCH_SIZE], include=[])["ids"])
+        ids = [i for i in ids if i not in existing]
+        new_docs = [docs_by_id[i] for i in ids]
+
+        if not new_docs:
+            logger.info("✅ All chunks are already stored in ChromaDB. Nothing to embed.")
+            return
+        logger.info(f"🔹 {len(new_docs)} new chunk(s) to embed, {len(existing)} already stored.")
+
+        # Embed batches concurrently to overlap network latency
+        texts = [doc.page_content for doc in new_docs]
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+            vectors = [vector for batch in executor.map(embeddings.embed_documents, batches) for vector in batch]
+
+        # Store unit vectors, so the L2 distance Chroma returns maps exactly to cosine similarity
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        # Store precomputed vectors so Chroma does not embed again; upsert replaces old vectors
+        store = collection.upsert if reembed else collection.add
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            end = start + EMBED_BATCH_SIZE
+            store(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                documents=texts[start:end],
+                metadatas=[doc.metadata for doc in new_docs[start:end]]
+            )
+
+        logger.info(f"✅ Successfully stored {len(new_docs)} vector embeddings in ChromaDB.")
     except Exception as e:
         logger.error(f"❌ Error storing embeddings in ChromaDB: {e}")
 
 
-def main():
+def main(reembed=False):
     """
     Pipeline to load, split, embed, and store embeddings.
     """
@@ -171,10 +256,11 @@ def main():
     split_docs = split_documents(documents)
 
     # Step 3: Embed and store in ChromaDB
-    embed_and_store_documents(split_docs)
+    embed_and_store_documents(split_docs, reembed=reembed)
 
     logger.info("🎯 Embedding process completed successfully!")
 
 
 if __name__ == "__main__":
-    main()
+    # `--reembed` overwrites every stored vector instead of only adding new chunks
+    main(reembed="--reembed" in sys.argv[1:])
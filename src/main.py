@@ -1,29 +1,111 @@
 import os
 import io
+import re
+import html
+import functools
+import threading
+import uuid as uuid_lib
 from flask import Flask, request, render_template, jsonify, send_file, make_response
-from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
+import tiktoken
+from waitress import serve
 
 from retriever.helper_retriever import HelperRetriever, VectorStoreManager
-from utils.db import get_connection
+from utils.db import pooled_connection
 import config
 
-load_dotenv()
-
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = "tmp_uploads"
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Job descriptions are plain text; reject anything larger outright.
+app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024
+
+# Worker threads of the production server; requests mostly wait on OpenAI and Postgres.
+SERVER_THREADS = 16
+
+# Input limit of the OpenAI embedding models; longer job descriptions are cut here.
+MAX_JD_TOKENS = 8191
+
+# Only real tags; text like "salary <50k" or "< 3 years" must survive
+HTML_TAG_RE = re.compile(r"</?[A-Za-z][^>]*>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Stored CV PDFs never change, so browsers may keep them for an hour without asking.
+ATTACHMENT_MAX_AGE = 60 * 60
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever():
+    """
+    Loads the vector store and retriever on first use and shares them across
+    requests, so importing the app stays cheap and each process loads them once.
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                # Load vector store using the shared VectorStoreManager.
+                vectorstore = VectorStoreManager.load_existing_vector_store()
+                if not vectorstore:
+                    raise Exception("Vector store could not be loaded.")
+                # The threshold applies to LLM scores, or to similarities when the rerank is off
+                threshold = 0.65 if config.LLM_RERANK else config.SIMILARITY_THRESHOLD
+                _retriever = HelperRetriever(vectorstore, threshold=threshold)
+    return _retriever
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    try:
+        return tiktoken.encoding_for_model(config.EMBEDDINGS_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def normalize_job_description(text):
+    """
+    Strips markup and redundant whitespace from a pasted job description and
+    caps it at the embedding model's token limit.
+    """
+    # Unescape after stripping, so escaped text such as "&lt;3 years&gt;" is never taken for a tag
+    text = html.unescape(HTML_TAG_RE.sub(" ", text))
+    text = WHITESPACE_RE.sub(" ", text).strip()
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) > MAX_JD_TOKENS:
+        text = encoding.decode(tokens[:MAX_JD_TOKENS])
+    return text
+
+
+def rank_candidates(job_description):
+    """
+    Searches and re-ranks CVs for a job description. Repeats are answered by
+    the retriever's ranking caches, which are invalidated when CVs are re-ingested.
+    """
+    filtered = get_retriever().rank(job_description)
+
+    response_data = []
+    for r in filtered:
+        # Remove path and file extension from the Chroma document ID.
+        uuid_name = os.path.splitext(os.path.basename(r["id"]))[0]
+        response_data.append({
+            "uuid": uuid_name,
+            "score": round(r["score"], 4),
+            "reason": r.get("reason", "N/A")
+        })
+    return response_data
+
 
-# Load vector store using the shared VectorStoreManager.
-vectorstore = VectorStoreManager.load_existing_vector_store()
-if not vectorstore:
-    raise Exception("Vector store could not be loaded.")
-retriever = HelperRetriever(vectorstore, threshold=0.65)
+@functools.lru_cache(maxsize=1)
+def render_index():
+    # The page carries no per-request data, so it is rendered once per process.
+    return render_template("index.html")
 
 
 @app.route("/", methods=["GET"])
 def index():
-    return render_template("index.html")
+    if app.debug:
+        return render_template("index.html")
+    return render_index()
 
 
 @app.route("/analyze", methods=["POST"])
@@ -36,51 +118,74 @@ def analyze():
     # File upload
     file = request.files.get("job_file")
     if file and file.filename.endswith(".txt"):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        with open(filepath, "r", encoding="utf-8") as f:
-            job_description = f.read()
+        # Read the upload in memory; it never needs to touch the disk.
+        job_description = file.stream.read().decode("utf-8", errors="replace")
 
+    job_description = normalize_job_description(job_description)
     if not job_description:
         return jsonify({"error": "No job description provided."}), 400
 
-    results = retriever.perform_search(job_description)
-    filtered = retriever.rerank_with_openai(job_description, results)
+    return jsonify(rank_candidates(job_description))
 
-    response_data = []
-    for r in filtered:
-        # Remove path and file extension from the Chroma document ID.
-        uuid_name = os.path.splitext(os.path.basename(r["id"]))[0]
-        response_data.append({
-            "uuid": uuid_name,
-            "score": round(r["score"], 4),
-            "reason": r.get("reason", "N/A")
-        })
 
-    return jsonify(response_data)
+def cache_attachment(response, etag):
+    """
+    Marks a CV PDF response as cacheable by the recruiter's browser only
+    (CVs are personal data) and as never changing for its ETag.
+    """
+    response.set_etag(etag)
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = ATTACHMENT_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route("/attachment/<uuid>")
 def get_attachment(uuid):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT filename, pdf FROM cv_attachment
-            WHERE id::text = %s OR filename = %s OR filename = %s
-        """, (uuid, uuid, f"{uuid}.json"))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+        cv_id = uuid_lib.UUID(uuid)
+    except ValueError:
+        cv_id = None
+
+    # Only a CV id names one fixed PDF; a filename may be ingested again under a new id.
+    etag = f"cv-{cv_id}" if cv_id is not None else None
+    # Answer revalidations without touching the database.
+    if etag and request.if_none_match.contains(etag):
+        return cache_attachment(make_response("", 304), etag)
+
+    try:
+        with pooled_connection() as conn, conn.cursor() as cur:
+            if cv_id is not None:
+                # Primary-key point read; casting id to text would force a full scan
+                cur.execute("SELECT filename, pdf FROM cv_attachment WHERE id = %s", (str(cv_id),))
+            else:
+                cur.execute("""
+                    SELECT filename, pdf FROM cv_attachment
+                    WHERE filename = %s OR filename = %s
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                """, (uuid, f"{uuid}.json"))
+            result = cur.fetchone()
+            # End the read-only transaction before the connection goes back to the pool
+            conn.rollback()
         if result:
             filename, pdf_bytes = result
-            return send_file(
+            response = send_file(
                 io.BytesIO(pdf_bytes),
                 mimetype="application/pdf",
                 download_name=filename,
-                as_attachment=False
+                as_attachment=False,
+                etag=False
             )
+            if etag is None:
+                # A filename lookup may resolve to a newer upload, so the browser must ask again
+                response.cache_control.public = False
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                return response
+            return cache_attachment(response, etag)
         else:
             return make_response("❌ No PDF found for this CV.", 404)
     except Exception as e:
@@ -88,4 +193,7 @@ def get_attachment(uuid):
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    if config.FLASK_DEBUG:
+        app.run(debug=True)
+    else:
+        serve(app, host="127.0.0.1", port=5000, threads=SERVER_THREADS)
@@ -1,10 +1,26 @@
+import io
 import os
+import re
 import sys
-import json
-from typing import List, Dict, Any, Optional
+import time
+import hashlib
+import logging
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
+import tiktoken
+import numpy as np
+import orjson
+from cachetools import LRUCache
 from langchain_chroma import Chroma
 from langchain.schema import Document
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain.storage import LocalFileStore
 from langchain.retrievers import MultiQueryRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 
 # Ensure the project root is in the Python path.
@@ -13,22 +29,208 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.logger import get_logger
+from utils.disk_cache import prune_cache
 import config
 
-logger = get_logger("HelperRetriever")
+# INFO by default, so the DEBUG-only payload logs (previews, raw LLM replies) cost nothing
+logger = get_logger("HelperRetriever", level=logging.INFO)
+
+# Number of nearest CVs fetched per query variant
+SEARCH_K = 20
+
+# Candidates below this similarity skip the LLM rerank, keeping at least
+# RERANK_MIN and at most RERANK_MAX CVs (the best ones) in the prompt.
+RERANK_CUTOFF = config.RERANK_CUTOFF
+RERANK_MIN = 3
+RERANK_MAX = 10
+
+# CVs at or above this similarity are accepted without asking the LLM.
+AUTO_ACCEPT_SIMILARITY = config.AUTO_ACCEPT_SIMILARITY
+
+# Model used for multi-query generation and reranking
+LLM_MODEL = "gpt-4o-mini"
+
+# Most CV text, in tokens, sent to the reranker per CV across all of its chunks
+RERANK_TOKENS_PER_CV = 1600
+
+# CVs judged per rerank call; the batches of one ranking are sent in parallel
+RERANK_BATCH_CVS = 5
+
+# Fixed head of every rerank prompt. It comes before the job description and
+# the CVs, so consecutive prompts share a byte-identical prefix that the
+# provider's prompt cache can reuse.
+RERANK_INSTRUCTIONS = (
+    "You are an AI HR assistant helping a recruiter select the most suitable CVs for the job description below.\n\n"
+    "Your task is to evaluate and score each CV based on how well it aligns with the job description.\n\n"
+    "Instructions:\n"
+    "- Prioritize CVs that clearly match the required skills, experience, certifications, and education.\n"
+    "- Strongly prefer candidates with direct and recent experience relevant to the role.\n"
+    "- Soft skills like motivation, communication, leadership, and initiative can increase relevance.\n"
+    "- If a candidate shows transferable skills and strong motivation, they can still be considered.\n"
+    "- Assign a relevance score between 0.0 and 1.0:\n"
+    "- Do not assign 0.0 unless the CV is completely unrelated.\n"
+    "- Avoid scoring duplicate or near-identical CVs.\n\n"
+    "Return only one line per CV in the format:\n"
+    "Document ID: <doc_id>, Score: <score>, Reason: <short_reason>\n\n"
+)
+
+# Bookkeeping fields at the top of stored CV text; the prompt already names each CV by id
+CV_METADATA_RE = re.compile(r"\A(?:(?:Id|Filename):\n[^\n]*\n\n)+")
+# Layout whitespace left over from PDF extraction
+INLINE_SPACE_RE = re.compile(r"[ \t\f\v]+")
+BLANK_LINES_RE = re.compile(r"\s*\n\s*")
+
+# Flattens line breaks in log previews
+PREVIEW_TABLE = str.maketrans({"\n": " ", "\r": " "})
+
+# One rerank verdict: "Document ID: <doc_id>, Score: <score>, Reason: <short_reason>"
+RERANK_LINE_RE = re.compile(
+    r"Document ID:\s*([^,\n]+?)\s*,\s*Score:\s*(\d*\.?\d+)(?![\d/%])(?:\s*,\s*Reason:\s*(.*))?",
+    re.IGNORECASE
+)
+
+# A job description this similar to one ranked within the TTL reuses its ranking.
+SEMANTIC_CACHE_SIMILARITY = 0.97
+SEMANTIC_CACHE_TTL = 3600
+SEMANTIC_CACHE_SIZE = 256
+
+# Embeddings of recent texts kept in memory, in front of the on-disk embedding cache
+EMBEDDING_MEMORY_CACHE_SIZE = 1024
+
+# One keep-alive connection pool shared by the embedding and chat clients,
+# so OpenAI calls reuse open TLS connections instead of reconnecting.
+# HTTP/2 lets the parallel rerank batches share a single connection.
+HTTP_CLIENT = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_encoding():
+    try:
+        return tiktoken.encoding_for_model(LLM_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+@functools.lru_cache(maxsize=32)
+def _read_job_description(path: str, mtime_ns: int, size: int) -> str:
+    # The modification time and size are part of the key, so an edited file is read again
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8").strip()
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm() -> ChatOpenAI:
+    """Returns the chat model shared by every retriever in the process."""
+    return ChatOpenAI(
+        temperature=0,
+        model_name=LLM_MODEL,
+        openai_api_key=config.OPENAI_API_KEY,
+        http_client=HTTP_CLIENT,
+        # The only retry layer: the client backs off on 429, 5xx and connection errors
+        max_retries=2
+    )
+
+
+def compact_cv_text(text: str) -> str:
+    """
+    Drops bookkeeping fields and layout whitespace from CV text before it is
+    sent to the LLM, keeping every word of the CV itself.
+    """
+    text = CV_METADATA_RE.sub("", text)
+    text = INLINE_SPACE_RE.sub(" ", text)
+    return BLANK_LINES_RE.sub("\n", text).strip()
+
+
+def read_json_cache(path: str) -> Optional[Any]:
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def write_json_cache(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see a partial entry
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(data))
+    os.replace(tmp_path, path)
+
+
+class MemoryCachedEmbeddings(Embeddings):
+    """
+    Keeps the vectors of recently embedded texts in process memory, so a
+    repeated job description or query variant skips both the API and the
+    disk cache. Queries and documents share one cache keyed by a text hash.
+    """
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = EMBEDDING_MEMORY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            vectors = [self._cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # One call for all misses, which still goes through the on-disk cache
+            fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, fresh):
+                    vectors[i] = tuple(vector)
+                    self._cache[keys[i]] = vectors[i]
+        return [list(vector) for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
 
 
 class VectorStoreManager:
     """Manages vector store operations."""
-    
+
+    _vectorstore: Optional[Chroma] = None
+    _lock = threading.Lock()
+
     @staticmethod
     def load_existing_vector_store() -> Optional[Chroma]:
+        """
+        Opens the Chroma store once per process and returns the same instance
+        to every caller. A failed load is not cached, so the next call retries.
+        """
+        with VectorStoreManager._lock:
+            if VectorStoreManager._vectorstore is None:
+                VectorStoreManager._vectorstore = VectorStoreManager._open_vector_store()
+            return VectorStoreManager._vectorstore
+
+    @staticmethod
+    def _open_vector_store() -> Optional[Chroma]:
         logger.info("📂 Loading existing Chroma vector store...")
+        # Expire old job descriptions, rankings and query vectors once per process
+        for path in (config.RANKING_CACHE_PATH, config.QUERY_VARIANTS_CACHE_PATH, config.EMBEDDINGS_CACHE_PATH):
+            prune_cache(path)
         try:
-            embeddings = OpenAIEmbeddings(
-                model=config.EMBEDDINGS_MODEL,
-                openai_api_key=config.OPENAI_API_KEY
-            )
+            # Query vectors are kept on disk by text hash, so repeated queries skip the API
+            embeddings = MemoryCachedEmbeddings(CacheBackedEmbeddings.from_bytes_store(
+                OpenAIEmbeddings(
+                    model=config.EMBEDDINGS_MODEL,
+                    dimensions=config.EMBEDDINGS_DIMENSIONS,
+                    openai_api_key=config.OPENAI_API_KEY,
+                    http_client=HTTP_CLIENT
+                ),
+                LocalFileStore(config.EMBEDDINGS_CACHE_PATH),
+                namespace=f"{config.EMBEDDINGS_MODEL}-{config.EMBEDDINGS_DIMENSIONS or 'full'}"
+            ))
             vectorstore = Chroma(
                 persist_directory=config.CHROMA_DB_PATH,
                 embedding_function=embeddings
@@ -44,19 +246,24 @@ class HelperRetriever:
     """Main retriever class for CV matching and ranking."""
     
     def __init__(self, vectorstore: Chroma, threshold: float = 0.5):
-        self.logger = get_logger("HelperRetriever")
+        self.logger = get_logger("HelperRetriever", level=logging.INFO)
         self.vectorstore = vectorstore
         self.threshold = threshold
 
-        self.llm = ChatOpenAI(
-            temperature=0,
-            model_name="gpt-4o-mini",
-            openai_api_key=config.OPENAI_API_KEY
-        )
+        # Semantic ranking cache: unit JD vectors (one row each) and their rankings
+        self._cache_lock = threading.Lock()
+        self._cache_vectors = None
+        self._cache_entries = []  # (timestamp, ranked results)
+        self._cache_collection_size = None  # CV collection size the entries were ranked against
+
+        # Stored CV text never changes between indexing runs, so formatting is memoized per content
+        self.format_content = functools.lru_cache(maxsize=1024)(self.format_content)
+
+        self.llm = get_llm()
 
         self.base_retriever = vectorstore.as_retriever(
             search_type="similarity", 
-            search_kwargs={"k": 20}
+            search_kwargs={"k": SEARCH_K}
         )
         
         self.retriever = MultiQueryRetriever.from_llm(
@@ -65,115 +272,378 @@ class HelperRetriever:
         )
 
     def load_job_description(self, path: str) -> Optional[str]:
-        if not os.path.exists(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
             self.logger.error(f"❌ Job description not found: {path}")
             return None
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read().strip()
+        content = _read_job_description(path, stat.st_mtime_ns, stat.st_size)
         self.logger.info(f"📄 Loaded job description from: {path}")
-        self.logger.debug(f"📝 Job Description:\n{content}")
+        self.logger.debug("📝 Job Description:\n%s", content)
         return content
 
     def perform_search(self, query: str) -> List[Dict[str, Any]]:
         try:
             self.logger.info("🔍 Performing OpenAI-powered multi-query search...")
-            documents = self.retriever.invoke(query)
+            queries = self.generate_queries(query) or [query]
+            documents = self.search_many(queries)
             if not documents:
                 self.logger.warning("⚠️ Multi-query returned 0 documents. Trying fallback...")
-                documents = self.base_retriever.invoke(query)
+                documents = self.search_many([query])
             if not documents:
                 self.logger.warning("⚠️ Still no results after fallback.")
                 return []
             results = []
             self.logger.info(f"✅ Retrieved {len(documents)} documents before reranking.")
-            for i, doc in enumerate(documents):
+            show_previews = self.logger.isEnabledFor(logging.DEBUG)
+            for i, (doc, score) in enumerate(documents):
                 doc_id = doc.metadata.get("source", f"doc_{i}")
-                preview = doc.page_content.strip().replace("\n", " ")[:200]
-                self.logger.info(f"\n--- Document #{i + 1} ---")
-                self.logger.info(f"📄 ID: {doc_id}")
-                self.logger.info(f"📃 Preview: {preview}")
-                self.logger.info(f"🟢 Score: 1.0000 (pre-reranking)\n")
-                results.append({"id": doc_id, "doc": doc, "score": 1.0})
+                if show_previews:
+                    preview = doc.page_content[:200].translate(PREVIEW_TABLE).strip()
+                    self.logger.debug(
+                        "\n--- Document #%d ---\n📄 ID: %s\n📃 Preview: %s\n🟢 Score: %.4f (pre-reranking)\n",
+                        i + 1, doc_id, preview, score
+                    )
+                results.append({"id": doc_id, "doc": doc, "score": score})
             return results
         except Exception as e:
             self.logger.error(f"❌ Error during search: {e}")
             return []
 
+    def rank(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Searches and re-ranks CVs for a job description. A job description nearly
+        identical to one ranked recently reuses that ranking, skipping the
+        multi-query, search and rerank LLM calls.
+        """
+        collection_size = self.vectorstore._collection.count()
+        ranking_path = self._ranking_cache_path(query, collection_size)
+        cached = self._load_ranking(ranking_path)
+        if cached is not None:
+            self.logger.info(f"♻️ Reusing stored ranking: {ranking_path}")
+            return cached
+
+        try:
+            # Goes through the in-memory and on-disk embedding caches, which search_many reuses
+            vector = np.asarray(self.vectorstore.embeddings.embed_documents([query])[0], dtype=np.float32)
+            vector /= np.linalg.norm(vector)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not embed job description for the ranking cache: {e}")
+            vector = None
+
+        if vector is not None:
+            cached = self.lookup_ranking(vector, collection_size)
+            if cached is not None:
+                self.logger.info("♻️ Reusing the ranking of a near-identical job description.")
+                return cached
+
+        results = self.perform_search(query)
+        candidates = self.select_rerank_candidates(results)
+        accepted, uncertain = self.split_confident(candidates)
+        reranked = True
+        if config.LLM_RERANK:
+            try:
+                filtered = accepted + self.rerank_with_openai(query, uncertain)
+            except Exception:
+                # Answer this request on similarity alone; the fallback is never cached
+                filtered = accepted + self.rank_by_similarity(uncertain)
+                reranked = False
+        else:
+            filtered = accepted + self.rank_by_similarity(uncertain)
+        # One list ordered by score: an LLM verdict above an auto-accepted similarity ranks first
+        filtered.sort(key=lambda r: r["score"], reverse=True)
+        # Only cache successful rankings; empty results may come from a transient failure.
+        if filtered and reranked:
+            self._save_ranking(ranking_path, filtered)
+            if vector is not None:
+                self.store_ranking(vector, filtered, collection_size)
+        return filtered
+
+    def _ranking_cache_path(self, query: str, collection_size: int) -> str:
+        # Re-ingesting CVs changes the collection size, and with it every key
+        key = "\0".join((
+            query, str(collection_size), str(self.threshold),
+            LLM_MODEL if config.LLM_RERANK else "", config.EMBEDDINGS_MODEL, str(config.EMBEDDINGS_DIMENSIONS)
+        ))
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(config.RANKING_CACHE_PATH, f"{digest}.json")
+
+    def generate_queries(self, query: str) -> List[str]:
+        """
+        Returns the LLM's rewrites of a job description, generated once and then
+        read back from disk, so re-ranking it (e.g. after re-ingesting CVs)
+        skips the query-generation call.
+        """
+        key = hashlib.sha256(f"{LLM_MODEL}\0{query}".encode("utf-8")).hexdigest()
+        path = os.path.join(config.QUERY_VARIANTS_CACHE_PATH, f"{key}.json")
+        queries = read_json_cache(path)
+        if queries is None:
+            queries = self.retriever.generate_queries(
+                query, CallbackManagerForRetrieverRun.get_noop_manager()
+            )
+            if queries:
+                write_json_cache(path, queries)
+        return queries
+
+    def _load_ranking(self, path: str) -> Optional[List[Dict[str, Any]]]:
+        entries = read_json_cache(path)
+        if entries is None:
+            return None
+        return [
+            {**entry, "doc": Document(page_content=entry["doc"], metadata=entry["metadata"])}
+            for entry in entries
+        ]
+
+    def _save_ranking(self, path: str, ranking: List[Dict[str, Any]]) -> None:
+        # Documents are stored as plain fields; they do not round-trip through pickling reliably
+        entries = [
+            {**{k: v for k, v in r.items() if k != "doc"},
+             "doc": r["doc"].page_content, "metadata": r["doc"].metadata}
+            for r in ranking
+        ]
+        write_json_cache(path, entries)
+
+    def lookup_ranking(self, vector: np.ndarray, collection_size: int) -> Optional[List[Dict[str, Any]]]:
+        with self._cache_lock:
+            self._expire_rankings(time.time() - SEMANTIC_CACHE_TTL, collection_size)
+            if not self._cache_entries:
+                return None
+            similarities = self._cache_vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < SEMANTIC_CACHE_SIMILARITY:
+                return None
+            return self._cache_entries[best][1]
+
+    def store_ranking(self, vector: np.ndarray, ranking: List[Dict[str, Any]], collection_size: int) -> None:
+        with self._cache_lock:
+            self._expire_rankings(time.time() - SEMANTIC_CACHE_TTL, collection_size)
+            if len(self._cache_entries) >= SEMANTIC_CACHE_SIZE:
+                # Entries are kept in insertion order, so the first one is the oldest
+                self._cache_entries.pop(0)
+                self._cache_vectors = self._cache_vectors[1:]
+            self._cache_entries.append((time.time(), ranking))
+            row = vector[np.newaxis, :]
+            self._cache_vectors = row if self._cache_vectors is None else np.vstack((self._cache_vectors, row))
+
+    def _expire_rankings(self, oldest: float, collection_size: int) -> None:
+        # Caller holds self._cache_lock
+        if collection_size != self._cache_collection_size:
+            # CVs were re-ingested since these rankings were made; none of them can be reused
+            self._cache_collection_size = collection_size
+            self._cache_entries = []
+            self._cache_vectors = None
+            return
+        expired = 0
+        while expired < len(self._cache_entries) and self._cache_entries[expired][0] < oldest:
+            expired += 1
+        if expired:
+            del self._cache_entries[:expired]
+            self._cache_vectors = self._cache_vectors[expired:]
+
+    def search_many(self, queries: List[str]) -> List[Tuple[Document, float]]:
+        """
+        Runs all query variants as one batch: a single embedding request and a
+        single Chroma query, instead of one round-trip of each per variant.
+        Returns the union of the hits with their best similarity, most similar first.
+        """
+        vectors = np.asarray(self.vectorstore.embeddings.embed_documents(queries), dtype=np.float32)
+        # Stored CV vectors are unit length; normalize the queries the same way
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        response = self.vectorstore._collection.query(
+            query_embeddings=vectors,
+            n_results=SEARCH_K,
+            include=["documents", "metadatas", "distances"]
+        )
+        best = {}
+        for contents, metadatas, distances in zip(
+            response["documents"], response["metadatas"], response["distances"]
+        ):
+            for content, metadata, distance in zip(contents, metadatas, distances):
+                # Squared L2 distance between unit vectors -> cosine similarity
+                score = 1.0 - distance / 2.0
+                # Identical text (the same chunk, or a re-uploaded CV) is sent to the reranker once
+                key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+                if key not in best or score > best[key][1]:
+                    best[key] = (Document(page_content=content, metadata=metadata or {}), score)
+        return sorted(best.values(), key=lambda hit: hit[1], reverse=True)
+
+    def select_rerank_candidates(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keeps only the CVs worth sending to the LLM: those at or above RERANK_CUTOFF,
+        padded up to RERANK_MIN and capped at RERANK_MAX distinct CVs.
+        `results` must be sorted by score, best first; all chunks of a kept CV are kept.
+        """
+        kept_ids = []
+        for r in results:
+            if r["id"] in kept_ids:
+                continue
+            if len(kept_ids) >= RERANK_MAX or (r["score"] < RERANK_CUTOFF and len(kept_ids) >= RERANK_MIN):
+                break
+            kept_ids.append(r["id"])
+        kept_ids = set(kept_ids)
+        candidates = [r for r in results if r["id"] in kept_ids]
+        self.logger.info(f"✂️ Sending {len(candidates)} of {len(results)} documents to the reranker.")
+        return candidates
+
+    def split_confident(self, candidates: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Separates CVs whose best chunk is at or above AUTO_ACCEPT_SIMILARITY, which
+        are accepted on their similarity, from those the LLM still has to judge.
+        Returns one entry per accepted CV and every chunk of the uncertain ones.
+        """
+        accepted, accepted_ids = [], set()
+        for r in candidates:
+            # Candidates are best first, so the first chunk seen per CV is its best
+            if r["score"] >= AUTO_ACCEPT_SIMILARITY and r["id"] not in accepted_ids:
+                accepted_ids.add(r["id"])
+                accepted.append({**r, "reason": "Very close semantic match to the job description"})
+        uncertain = [r for r in candidates if r["id"] not in accepted_ids]
+        if accepted:
+            self.logger.info(f"⚡ Accepted {len(accepted)} CV(s) on similarity alone, {len(uncertain)} document(s) left for reranking.")
+        return accepted, uncertain
+
+    def rank_by_similarity(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ranks CVs on the similarity of their best chunk, keeping those at or above
+        the threshold. Used instead of the LLM rerank when LLM_RERANK is off.
+        """
+        ranked, seen = [], set()
+        for r in results:
+            # Results are best first, so the first chunk seen per CV is its best
+            if r["id"] in seen:
+                continue
+            seen.add(r["id"])
+            if r["score"] >= self.threshold:
+                ranked.append({**r, "reason": "Semantic similarity to the job description"})
+        self.logger.info(f"📐 Ranked {len(ranked)} candidates on similarity above threshold {self.threshold}.")
+        return ranked
+
     def rerank_with_openai(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Scores CVs with the LLM and keeps those at or above the threshold.
+        Raises if any rerank call fails, so a partial ranking is never returned.
+        """
         try:
             if not results:
                 self.logger.warning("⚠️ Skipping reranking – no documents to process.")
                 return []
             self.logger.info("🤖 Re-ranking results using OpenAI LLM to simulate HR filtering...")
-            prompt = (
-                f"You are an AI HR assistant helping a recruiter select the most suitable CVs for the following job description:\n\n"
-                f"Job Description:\n{query}\n\n"
-                f"Your task is to evaluate and score each CV based on how well it aligns with the job description above.\n\n"
-                f"Instructions:\n"
-                f"- Prioritize CVs that clearly match the required skills, experience, certifications, and education.\n"
-                f"- Strongly prefer candidates with direct and recent experience relevant to the role.\n"
-                f"- Soft skills like motivation, communication, leadership, and initiative can increase relevance.\n"
-                f"- If a candidate shows transferable skills and strong motivation, they can still be considered.\n"
-                f"- Assign a relevance score between 0.0 and 1.0:\n"
-                f"- Do not assign 0.0 unless the CV is completely unrelated.\n"
-                f"- Avoid scoring duplicate or near-identical CVs.\n\n"
-                f"Return only one line per CV in the format:\n"
-                f"Document ID: <doc_id>, Score: <score>, Reason: <short_reason>"
-            )
+            encoding = get_llm_encoding()
+            tokens_left, blocks = {}, {}
             for r in results:
-                prompt += f"\nDocument ID: {r['id']}\nContent:\n{r['doc'].page_content}\n"
-            response = self.llm.invoke(prompt).content.strip()
-            self.logger.debug(f"🔁 LLM Raw Response:\n{response}")
-
-            ids, scores, reasons, seen = [], [], [], set()
-            for line in response.splitlines():
-                try:
-                    if not line.lower().startswith("document id:"):
-                        continue
-                    parts = line.split(",")
-                    doc_id = parts[0].split(":", 1)[1].strip()
-                    score = float(parts[1].split(":", 1)[1].strip())
-                    reason = parts[2].split(":", 1)[1].strip() if len(parts) > 2 else "N/A"
-                    if score >= self.threshold and doc_id not in seen:
-                        ids.append(doc_id)
-                        scores.append(score)
-                        reasons.append(reason)
-                        seen.add(doc_id)
-                except Exception as e:
-                    self.logger.warning(f"⚠️ Skipped line: {line} | {e}")
+                # Results are best first, so a CV's most relevant chunks use up its budget first
+                budget = tokens_left.get(r["id"], RERANK_TOKENS_PER_CV)
+                if budget <= 0:
+                    continue
+                content = compact_cv_text(r["doc"].page_content)
+                tokens = encoding.encode(content, disallowed_special=())
+                if len(tokens) > budget:
+                    content = encoding.decode(tokens[:budget])
+                tokens_left[r["id"]] = budget - len(tokens)
+                blocks.setdefault(r["id"], []).append(f"\nDocument ID: {r['id']}\nContent:\n{content}\n")
 
+            # All chunks of a CV stay in the same batch
+            cv_blocks = list(blocks.values())
+            head = [RERANK_INSTRUCTIONS, "Job Description:\n", query, "\n\nCVs:\n"]
+            cv_ids = list(blocks)
+            prompts = [
+                "".join(head + [block for cv in cv_blocks[i:i + RERANK_BATCH_CVS] for block in cv])
+                for i in range(0, len(cv_blocks), RERANK_BATCH_CVS)
+            ]
+            batch_ids = [cv_ids[i:i + RERANK_BATCH_CVS] for i in range(0, len(cv_ids), RERANK_BATCH_CVS)]
+            if len(prompts) == 1:
+                responses = [self.invoke_llm(prompts[0], batch_ids[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+                    responses = list(executor.map(self.invoke_llm, prompts, batch_ids))
+
+            # Index the candidates once; the first (best) chunk of each CV wins
+            results_by_id = {}
+            for r in results:
+                results_by_id.setdefault(r["id"], r)
+
+            # One pass: parse, apply the threshold and pick the candidate for each verdict
             filtered = []
-            for i, doc_id in enumerate(ids):
-                match = next((r for r in results if r["id"] == doc_id), None)
-                if match:
-                    match["score"] = scores[i]
-                    match["reason"] = reasons[i]
-                    filtered.append(match)
+            for response in responses:
+                # Lazy formatting: the full LLM reply is only built into a string when DEBUG is on
+                self.logger.debug("🔁 LLM Raw Response:\n%s", response)
+                for verdict in RERANK_LINE_RE.finditer(response):
+                    score = float(verdict.group(2))
+                    # Scores outside the requested 0.0-1.0 scale would sort above every real verdict
+                    if score < self.threshold or score > 1.0:
+                        continue
+                    # Popping keeps only the first passing verdict per CV
+                    candidate = results_by_id.pop(verdict.group(1), None)
+                    if candidate:
+                        candidate["score"] = score
+                        candidate["reason"] = (verdict.group(3) or "").strip() or "N/A"
+                        filtered.append(candidate)
+            # Each batch is scored on the same absolute scale, so the merged results sort as one list
+            filtered.sort(key=lambda r: r["score"], reverse=True)
 
             self.logger.info(f"✅ Re-ranked and selected {len(filtered)} candidates above threshold {self.threshold}.")
             return filtered
 
         except Exception as e:
             self.logger.error(f"❌ Error during reranking: {e}")
-            return results  # fallback
+            raise
+
+    def invoke_llm(self, prompt: str, expected_ids: List[str] = ()) -> str:
+        """
+        Streams the LLM reply; the OpenAI client already retries rate-limited and transient failures.
+        Stops reading as soon as every id in `expected_ids` has a verdict line.
+        """
+        pending = set(expected_ids)
+        buf = io.StringIO()
+        parsed_to = 0
+        for chunk in self.llm.stream(prompt):
+            buf.write(chunk.content)
+            if pending and "\n" in chunk.content:
+                # Only complete lines are parsed; the last one may still be growing
+                text = buf.getvalue()
+                line_end = text.rfind("\n")
+                for match in RERANK_LINE_RE.finditer(text, parsed_to, line_end):
+                    pending.discard(match.group(1))
+                parsed_to = line_end + 1
+                if not pending:
+                    break
+        return buf.getvalue().strip()
 
     def format_content(self, content: str) -> str:
+        # Most chunks are plain text; only try to parse what can be a JSON object
+        if not content.lstrip().startswith("{"):
+            return content
         try:
-            data = json.loads(content)
-            return self.flatten_json(data)
-        except:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError:
             return content
+        return self.flatten_json(data)
 
     def flatten_json(self, data: Dict[str, Any]) -> str:
-        lines = []
-        for key, value in data.items():
+        buf = io.StringIO()
+        # One iterator per open object; an explicit stack instead of recursion
+        stack = [iter(data.items())]
+        first = True
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                # The enclosing object already holds this one's header line
+                first = False
+                continue
+            key, value = item
+            if not first:
+                buf.write("\n")
+            first = False
             if isinstance(value, list):
-                lines.append(f"{key.title()}: {', '.join(map(str, value))}")
+                buf.write(f"{key.title()}: {', '.join(map(str, value))}")
             elif isinstance(value, dict):
-                lines.append(f"{key.title()}:\n{self.flatten_json(value)}")
+                buf.write(f"{key.title()}:\n")
+                stack.append(iter(value.items()))
+                first = True
             else:
-                lines.append(f"{key.title()}: {value}")
-        return "\n".join(lines)
+                buf.write(f"{key.title()}: {value}")
+        return buf.getvalue()
 
     def display_results(self, results: List[Dict[str, Any]]) -> None:
         self.logger.info(f"📊 Displaying {len(results)} top matched CV(s):")
@@ -193,8 +663,7 @@ class HelperRetriever:
         query = self.load_job_description(job_path)
         if not query:
             return
-        raw_results = self.perform_search(query)
-        filtered_results = self.rerank_with_openai(query, raw_results)
+        filtered_results = self.rank(query)
         self.display_results(filtered_results)
 
 
@@ -1,9 +1,10 @@
 import os
 import sys
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.retrievers import MultiQueryRetriever, ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import LLMChainExtractor
+import hashlib
+import functools
+import threading
+from cachetools import TTLCache
+from langchain.retrievers import MultiQueryRetriever
 
 # Ensure the project root is in the Python path.
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -11,41 +12,79 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.logger import get_logger
+from retriever.helper_retriever import VectorStoreManager, get_llm  # Re-use the common vector store loader and chat model
 import config
-from retriever.helper_retriever import VectorStoreManager  # Re-use the common vector store loader
 
 logger = get_logger("Retriever")
 
-# Load the common vector store
-vector_store = VectorStoreManager.load_existing_vector_store()
-if not vector_store:
-    logger.error("Vector store could not be loaded.")
+# Compression keeps only the passages of each CV this similar to the query
+COMPRESSION_SPLIT_SIZE = 300
+COMPRESSION_SIMILARITY = config.COMPRESSION_SIMILARITY
+
+# Recent search results, reused for repeated queries within the TTL (seconds)
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 300
 
 
 class Retriever:
-    def __init__(self):
+    def __init__(self, vectorstore=None):
         self.logger = get_logger("Retriever")
-        self.llm = ChatOpenAI(
-            temperature=0,
-            model_name="gpt-4o-mini",
-            openai_api_key=config.OPENAI_API_KEY
-        )
-        base_retriever = vector_store.as_retriever(
+        self._search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self._search_cache_lock = threading.Lock()
+        self.llm = get_llm()
+        # The shared store is opened on first use, not when this module is imported
+        vectorstore = vectorstore or VectorStoreManager.load_existing_vector_store()
+        if not vectorstore:
+            raise RuntimeError("Vector store could not be loaded.")
+        base_retriever = vectorstore.as_retriever(
             search_type="similarity", search_kwargs={"k": 20}
         )
         self.multi_query_retriever = MultiQueryRetriever.from_llm(
             retriever=base_retriever,
             llm=self.llm
         )
-        compressor = LLMChainExtractor.from_llm(self.llm)
+        # Compression is only needed once a Retriever is built, so its modules load here
+        from langchain.retrievers import ContextualCompressionRetriever
+        from langchain.retrievers.document_compressors import DocumentCompressorPipeline, EmbeddingsFilter
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        # Extractive compression: split CVs into short passages and keep the ones close
+        # to the query, scored with one batched embedding call instead of an LLM call per CV
+        compressor = DocumentCompressorPipeline(transformers=[
+            RecursiveCharacterTextSplitter(chunk_size=COMPRESSION_SPLIT_SIZE, chunk_overlap=0),
+            EmbeddingsFilter(
+                embeddings=vectorstore.embeddings,
+                similarity_threshold=COMPRESSION_SIMILARITY
+            )
+        ])
         self.compression_retriever = ContextualCompressionRetriever(
             base_compressor=compressor,
             base_retriever=self.multi_query_retriever
         )
 
+    def clear_cache(self):
+        """Forgets cached search results, e.g. after re-ingesting CVs."""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+
     def search(self, query: str):
+        key = hashlib.blake2b(query.strip().lower().encode("utf-8"), digest_size=16).digest()
+        with self._search_cache_lock:
+            cached = self._search_cache.get(key)
+        if cached is not None:
+            self.logger.info("♻️ Reusing cached results for a repeated query.")
+            return cached
+
+        results = self._search(query)
+        # Only cache successful searches; empty results may come from a transient failure.
+        if results:
+            with self._search_cache_lock:
+                self._search_cache[key] = results
+        return results
+
+    def _search(self, query: str):
         try:
-            self.logger.info("🔍 Performing retrieval with OpenAI-powered compression...")
+            self.logger.info("🔍 Performing retrieval with embedding-based compression...")
             documents = self.compression_retriever.invoke(query)
             results = []
             for i, doc in enumerate(documents):
@@ -60,7 +99,13 @@ class Retriever:
             return []
 
 
+@functools.lru_cache(maxsize=1)
+def get_retriever() -> Retriever:
+    """Returns the Retriever shared by every caller in the process."""
+    return Retriever()
+
+
 if __name__ == "__main__":
-    retriever_instance = Retriever()
+    retriever_instance = get_retriever()
     sample_query = "Sample job description for testing retrieval."
     retriever_instance.search(sample_query)
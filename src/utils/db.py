@@ -1,14 +1,65 @@
 import os
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Connections kept open by the shared pool
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 8
+
+# Read once at import; the environment does not change while the app runs
+CONNECTION_PARAMS = dict(
+    dbname=os.getenv("POSTGRES_DB"),
+    user=os.getenv("POSTGRES_USER"),
+    password=os.getenv("POSTGRES_PASSWORD"),
+    host=os.getenv("POSTGRES_HOST"),
+    port=os.getenv("POSTGRES_PORT")
+)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+# getconn() raises PoolError when every connection is out, so borrowers wait here instead
+_pool_slots = threading.BoundedSemaphore(POOL_MAX_CONNECTIONS)
+
+
 def get_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT")
-    )
+    return psycopg2.connect(**CONNECTION_PARAMS)
+
+
+def get_pool():
+    """
+    Returns the process-wide PostgreSQL connection pool, creating it on first use.
+    A forked child gets its own pool rather than sharing the parent's sockets.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadedConnectionPool(
+                    POOL_MIN_CONNECTIONS,
+                    POOL_MAX_CONNECTIONS,
+                    **CONNECTION_PARAMS
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrows a connection from the shared pool and returns it when done,
+    waiting for a free connection when all of them are in use.
+    """
+    pool = get_pool()
+    with _pool_slots:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            # Drop connections that broke while borrowed instead of reusing them
+            pool.putconn(conn, close=bool(conn.closed))
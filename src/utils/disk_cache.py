@@ -0,0 +1,54 @@
+import os
+import time
+
+from utils.logger import get_logger
+
+logger = get_logger("DiskCache")
+
+# Entries older than this are deleted when a cache directory is pruned
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Largest size of one cache directory; the oldest entries go first above it
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def prune_cache(path, max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES):
+    """
+    Delete expired entries from an on-disk cache directory, then the oldest
+    remaining ones until the directory fits within `max_bytes`.
+
+    Args:
+        path (str): The cache directory; a missing directory is left alone.
+        max_age (float): Largest entry age, in seconds, by modification time.
+        max_bytes (int): Largest total size of the kept entries.
+
+    Returns:
+        int: Number of entries deleted.
+    """
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+
+    # Newest first, so everything after the age or size limit is deleted
+    entries.sort(reverse=True)
+    oldest = time.time() - max_age
+    kept_bytes = 0
+    deleted = 0
+    for mtime, size, file_path in entries:
+        kept_bytes += size
+        if mtime >= oldest and kept_bytes <= max_bytes:
+            continue
+        try:
+            os.remove(file_path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+
+    if deleted:
+        logger.info("🧹 Pruned %s cache entries from %s", deleted, path)
+    return deleted
@@ -1,32 +1,43 @@
 #logger.py 
 
+import os
+import sys
+import atexit
 import logging
-from colorama import Fore, Style, init
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # Suppress unnecessary logs from specific modules
 logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
 
-# Initialize colorama for cross-platform support
-init(autoreset=True)
+# Only older Windows consoles need help to understand ANSI codes
+if sys.platform == "win32":
+    from colorama import just_fix_windows_console
+    just_fix_windows_console()
 
-# Define updated color codes for different log levels
+# Colors are only written to a terminal, not to redirected or piped output
+USE_COLORS = sys.stderr.isatty()
+
+# Define updated color codes for different log levels (raw ANSI escapes)
 LOG_COLORS = {
-    logging.DEBUG: Fore.LIGHTBLUE_EX,          # Debug messages in light blue
-    logging.INFO: Fore.LIGHTGREEN_EX,         # Info messages in light green
-    logging.WARNING: Fore.LIGHTYELLOW_EX,     # Warnings in light yellow
-    logging.ERROR: Fore.LIGHTRED_EX,          # Errors in light red
-    logging.CRITICAL: Fore.MAGENTA + Style.BRIGHT,  # Critical errors in bright magenta
+    logging.DEBUG: "\033[94m",          # Debug messages in light blue
+    logging.INFO: "\033[92m",           # Info messages in light green
+    logging.WARNING: "\033[93m",        # Warnings in light yellow
+    logging.ERROR: "\033[91m",          # Errors in light red
+    logging.CRITICAL: "\033[35;1m",     # Critical errors in bright magenta
 }
+RESET_COLOR = "\033[0m"
 
 class SimpleColorFormatter(logging.Formatter):
     """
     A custom logging formatter to add colors based on log levels.
     """
-    def __init__(self, fmt=None, datefmt="%Y-%m-%d %H:%M:%S", style='%'):
+    def __init__(self, fmt=None, datefmt="%Y-%m-%d %H:%M:%S", style='%', use_colors=USE_COLORS):
         # Default log format if none is provided
         if not fmt:
             fmt = "%(asctime)s - %(levelname)s - %(message)s"
         super().__init__(fmt, datefmt, style)
+        self.use_colors = use_colors
 
     def format(self, record):
         """
@@ -38,16 +49,66 @@ class SimpleColorFormatter(logging.Formatter):
         Returns:
             str: The formatted log message with colorized log level.
         """
-        # Apply the color to the log level
-        log_color = LOG_COLORS.get(record.levelno, "")
-        levelname_colored = f"{log_color}{record.levelname}{Style.RESET_ALL}"
-        record.levelname = levelname_colored  # Update the record's level name
+        log_color = LOG_COLORS.get(record.levelno) if self.use_colors else None
+        if not log_color:
+            return super().format(record)
+        # Color a copy, so other handlers never see (or re-color) a modified level name
+        record = logging.makeLogRecord(record.__dict__)
+        record.levelname = f"{log_color}{record.levelname}{RESET_COLOR}"
         return super().format(record)
 
+_log_queue = queue.SimpleQueue()
+_listener = None
+
+
+def _get_listener():
+    """
+    Start the shared background listener that writes queued records to the terminal.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+    """
+    global _listener
+    if _listener is None:
+        # Create a console handler for terminal output
+        console_handler = logging.StreamHandler()
+
+        # Set the custom formatter for colorized logs
+        formatter = SimpleColorFormatter(
+            fmt="%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+        console_handler.setFormatter(formatter)
+
+        _listener = QueueListener(_log_queue, console_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return _listener
+
+
+def _restart_listener_in_child():
+    """
+    Start a fresh listener in forked worker processes, whose copy of the
+    parent's listener has no running thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener = None
+        _get_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
 def get_logger(name="AppLogger", level=logging.DEBUG):
     """
     Create and configure a logger with colored output for terminal logs.
 
+    The calling thread merges each record's message with its arguments
+    (`QueueHandler.prepare`) and puts it on a queue; timestamps, colors and
+    writing to the terminal happen on a shared background listener thread.
+
     Args:
         name (str): The name of the logger.
         level (int): The logging level (e.g., DEBUG, INFO, WARNING).
@@ -60,19 +121,14 @@ def get_logger(name="AppLogger", level=logging.DEBUG):
 
     # Avoid adding multiple handlers to the logger
     if not logger.handlers:
-        # Create a console handler for terminal output
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(level)
+        _get_listener()
 
-        # Set the custom formatter for colorized logs
-        formatter = SimpleColorFormatter(
-            fmt="%(asctime)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        console_handler.setFormatter(formatter)
+        # Hand records over to the listener thread
+        queue_handler = QueueHandler(_log_queue)
+        queue_handler.setLevel(level)
 
         # Add the handler to the logger
-        logger.addHandler(console_handler)
+        logger.addHandler(queue_handler)
 
     return logger
 
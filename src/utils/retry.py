@@ -0,0 +1,60 @@
+import time
+import random
+from functools import wraps
+
+from utils.logger import get_logger
+
+logger = get_logger("Retry")
+
+
+def _retry_after(error):
+    """
+    Read the server-suggested delay (in seconds) from an HTTP error, if any.
+
+    Args:
+        error (Exception): The raised exception.
+
+    Returns:
+        float | None: The delay in seconds, or None if the error carries no hint.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return float(value) / scale
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def retry(attempts=3, base=2.0, retry_on=(Exception,)):
+    """
+    Retry a function with exponential backoff and jitter on transient errors.
+
+    Args:
+        attempts (int): Total number of calls before giving up.
+        base (float): Base of the exponential backoff, in seconds.
+        retry_on (tuple): Exception types that should trigger a retry.
+
+    Returns:
+        Callable: A decorator wrapping the function with retries.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return fn(*args, **kwargs)
+                except retry_on as e:
+                    if attempt == attempts - 1:
+                        raise
+                    delay = _retry_after(e)
+                    if delay is None:
+                        delay = base ** attempt + random.random()
+                    logger.warning("⚠️ %s failed (%s), retrying in %.1fs...", fn.__name__, e, delay)
+                    time.sleep(delay)
+        return wrapper
+    return decorator